@@ -1,18 +1,197 @@
-from typing import Dict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from enum import StrEnum
+from pydantic import BaseModel
 import asyncio
+import hashlib
+import json
+import time
 from .services.cosmos_store import ConversationStore, JobState
 
 
+class StepStatus(StrEnum):
+    COMPLETED = "completed"
+    CACHED = "cached"
+    BLOCKED = "blocked"
+    FAILED = "failed"
+
+
+@dataclass
+class Step:
+    # `inputs` are job context keys the step needs; `depends_on` are upstream steps whose outputs it consumes
+    name: str
+    run: Callable[[Dict], Awaitable[Any]]
+    inputs: List[str] = field(default_factory=list)
+    depends_on: List[str] = field(default_factory=list)
+
+
+class StepResult(BaseModel):
+    status: StepStatus
+    input_hash: Optional[str] = None
+    output: Any = None
+    missing: List[str] = []
+    error: Optional[str] = None
+    duration_ms: float = 0.0
+
+
+# Placeholder agents; swap for real model calls
+async def assess_damage(inputs: Dict) -> Dict:
+    await asyncio.sleep(0.1)
+    return {"images_reviewed": len(inputs["images"]), "severity": "unknown"}
+
+
+async def summarise_transcripts(inputs: Dict) -> Dict:
+    await asyncio.sleep(0.1)
+    return {"transcripts_reviewed": len(inputs["transcripts"]), "summary": inputs["initial_text"][:200]}
+
+
+async def lookup_policy(inputs: Dict) -> Dict:
+    await asyncio.sleep(0.1)
+    return {"license_plate": inputs["license_plate"], "policy_found": False}
+
+
+async def score_fraud(inputs: Dict) -> Dict:
+    await asyncio.sleep(0.1)
+    return {"score": 0.0 if inputs["policy_lookup"]["policy_found"] else 0.5}
+
+
+DEFAULT_STEPS = [
+    Step("damage_assessment", assess_damage, inputs=["images"]),
+    Step("transcript_summary", summarise_transcripts, inputs=["initial_text", "transcripts"]),
+    Step("policy_lookup", lookup_policy, inputs=["license_plate"]),
+    Step("fraud_score", score_fraud, depends_on=["damage_assessment", "transcript_summary", "policy_lookup"]),
+]
+
+
+# Keys the workflow itself writes to the job context; never taken from user input
+RESERVED_CONTEXT_KEYS = {"steps", "missing", "error", "result", "duration_ms"}
+
+
+def _hash_inputs(inputs: Dict) -> str:
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 class ClaimWorkflow:
-    def __init__(self, conv: ConversationStore):
+    def __init__(self, conv: ConversationStore, steps: Optional[List[Step]] = None, max_concurrency: int = 4):
         self.conv = conv
+        self.steps = self._toposort(steps if steps is not None else DEFAULT_STEPS)
+        self.max_concurrency = max_concurrency
 
-    async def start_claim_intake(self, session_id: str, initial_text: str) -> Dict:
-        # Create a job that might pause for user input in the middle
-        job = await self.conv.create_job(session_id, {"initial_text": initial_text})
+    @staticmethod
+    def _toposort(steps: List[Step]) -> List[Step]:
+        if not steps:
+            raise ValueError("workflow needs at least one step")
+        by_name = {s.name: s for s in steps}
+        if len(by_name) != len(steps):
+            raise ValueError("duplicate step names in workflow")
+        for s in steps:
+            unknown = [d for d in s.depends_on if d not in by_name]
+            if unknown:
+                raise ValueError(f"step {s.name!r} depends on unknown steps: {unknown}")
+            reserved = [k for k in s.inputs if k in RESERVED_CONTEXT_KEYS]
+            if reserved:
+                raise ValueError(f"step {s.name!r} reads reserved context keys: {reserved}")
+        ordered: List[Step] = []
+        visiting: set = set()
+        done: set = set()
+
+        def visit(s: Step):
+            if s.name in done:
+                return
+            if s.name in visiting:
+                raise ValueError(f"cycle in workflow at step {s.name!r}")
+            visiting.add(s.name)
+            for d in s.depends_on:
+                visit(by_name[d])
+            visiting.discard(s.name)
+            done.add(s.name)
+            ordered.append(s)
+
+        for s in steps:
+            visit(s)
+        return ordered
+
+    async def start_claim_intake(self, session_id: str, initial_text: str, images: Optional[List[str]] = None, transcripts: Optional[List[str]] = None) -> Dict:
+        context = {"initial_text": initial_text, "images": images or [], "transcripts": transcripts or []}
+        job = await self.conv.create_job(session_id, context)
         await self.conv.update_job_state(job.id, JobState.PROCESSING)
-        # Simulate steps
-        await asyncio.sleep(0.1)
-        # Ask for missing data
-        await self.conv.update_job_state(job.id, JobState.AWAITING_USER_INPUT, {"missing": "Please provide license plate number"})
-        return {"job_id": job.id}
+        return await self._execute(job.id, context)
+
+    async def resume_claim(self, job_id: str, user_input: Dict) -> Optional[Dict]:
+        job = await self.conv.get_job(job_id)
+        if not job:
+            return None
+        context = dict(job.get("context", {}))
+        cache = self._load_cache(context.pop("steps", None))
+        user_input = {k: v for k, v in user_input.items() if k not in RESERVED_CONTEXT_KEYS}
+        context.update(user_input)
+        await self.conv.update_job_state(job_id, JobState.PROCESSING, {**user_input, "missing": None, "error": None, "result": None})
+        return await self._execute(job_id, context, cache)
+
+    def _load_cache(self, records: Any) -> Dict[Tuple[str, str], Any]:
+        # (step name, input hash) -> output, rebuilt from the step records _execute persisted
+        cache: Dict[Tuple[str, str], Any] = {}
+        if not isinstance(records, dict):
+            return cache
+        names = {s.name for s in self.steps}
+        for name, rec in records.items():
+            if name not in names or not isinstance(rec, dict):
+                continue
+            if rec.get("status") in (StepStatus.COMPLETED, StepStatus.CACHED) and rec.get("input_hash"):
+                cache[(name, rec["input_hash"])] = rec.get("output")
+        return cache
+
+    async def _execute(self, job_id: str, context: Dict, cache: Optional[Dict[Tuple[str, str], Any]] = None) -> Dict:
+        started = time.perf_counter()
+        results = await self._run_graph(context, cache or {})
+        total_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        failed = {n: r.error for n, r in results.items() if r.status == StepStatus.FAILED}
+        missing = sorted({m for r in results.values() for m in r.missing})
+        if failed:
+            state, patch = JobState.FAILED, {"error": failed}
+        elif missing:
+            state, patch = JobState.AWAITING_USER_INPUT, {"missing": missing}
+        else:
+            upstream = {d for s in self.steps for d in s.depends_on}
+            state, patch = JobState.COMPLETED, {"result": {n: r.output for n, r in results.items() if n not in upstream}}
+        patch["duration_ms"] = total_ms
+        # One write for the whole graph: replaces every step record (blocked ones included) and
+        # keeps store I/O off the concurrent section
+        steps = {n: r.model_dump() for n, r in results.items()}
+        await self.conv.update_job_state(job_id, state, {**patch, "steps": steps})
+        return {"job_id": job_id, "state": state, "steps": steps, **patch}
+
+    async def _run_graph(self, context: Dict, cache: Dict[Tuple[str, str], Any]) -> Dict[str, StepResult]:
+        sem = asyncio.Semaphore(self.max_concurrency)
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(step: Step) -> StepResult:
+            upstream = {d: await tasks[d] for d in step.depends_on}
+            unmet = [d for d, r in upstream.items() if r.status not in (StepStatus.COMPLETED, StepStatus.CACHED)]
+            missing = [k for k in step.inputs if context.get(k) is None]
+            if unmet or missing:
+                return StepResult(status=StepStatus.BLOCKED, missing=missing, error=f"waiting on {unmet}" if unmet else None)
+
+            inputs = {k: context[k] for k in step.inputs}
+            inputs.update({d: r.output for d, r in upstream.items()})
+            input_hash = _hash_inputs(inputs)
+            key = (step.name, input_hash)
+            if key in cache:
+                return StepResult(status=StepStatus.CACHED, input_hash=input_hash, output=cache[key])
+
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    output = await step.run(inputs)
+                    result = StepResult(status=StepStatus.COMPLETED, input_hash=input_hash, output=output)
+                except Exception as e:
+                    result = StepResult(status=StepStatus.FAILED, input_hash=input_hash, error=str(e))
+                result.duration_ms = round((time.perf_counter() - t0) * 1000, 2)
+            return result
+
+        for step in self.steps:
+            tasks[step.name] = asyncio.create_task(run_step(step))
+        await asyncio.gather(*tasks.values())
+        return {name: task.result() for name, task in tasks.items()}
@@ -4,12 +4,13 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import os
 import uuid
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
 from .services.webpubsub import WebPubSubHub
 from .services.cosmos_store import ConversationStore, JobState, JobRecord
 from .services.sql_store import SQLStore
 from .services.blob_store import BlobStore
+from .agents import ClaimWorkflow
 from .routers import __init__ as routers_init  # noqa: F401
 from .routers.claims import router as claims_router
 
@@ -66,7 +67,8 @@ class ChatMessage(BaseModel):
 
 class ResumeJobRequest(BaseModel):
     job_id: str
-    user_input: str
+    # Keyed by the names listed in the job's "missing" field, e.g. {"license_plate": "AB12 CDE"}
+    user_input: Dict[str, Any]
 
 
 @app.get("/api/webpubsub/token")
@@ -143,23 +145,19 @@ async def upload_transcript(
 
 
 @app.post("/api/jobs/resume")
-async def resume_job(req: ResumeJobRequest, conv_store: ConversationStore = Depends(get_conv_store)):
-    job = await conv_store.get_job(req.job_id)
-    if not job:
+async def resume_job(req: ResumeJobRequest, conv_store: ConversationStore = Depends(get_conv_store), wps: WebPubSubHub = Depends(get_webpubsub)):
+    result = await ClaimWorkflow(conv_store).resume_claim(req.job_id, req.user_input)
+    if not result:
         return JSONResponse(status_code=404, content={"error": "job not found"})
-    await conv_store.update_job_state(req.job_id, JobState.PROCESSING, {"user_input": req.user_input})
-    # Simulate some processing and completion
-    await conv_store.update_job_state(req.job_id, JobState.COMPLETED, {"result": "updated with user input"})
-    return {"status": "resumed", "job_id": req.job_id}
+    await wps.send_to_all("job.update", {"job_id": req.job_id, "state": result["state"], "missing": result.get("missing")})
+    return {"status": "resumed", **result}
 
 
 @app.post("/api/workflow/start")
 async def start_workflow(session_id: str, text: str, conv_store: ConversationStore = Depends(get_conv_store), wps: WebPubSubHub = Depends(get_webpubsub)):
-    # Very simple demo: create a job and request user input
-    job = await conv_store.create_job(session_id, {"initial_text": text})
-    await conv_store.update_job_state(job.id, JobState.AWAITING_USER_INPUT, {"missing": "Please provide license plate number"})
-    await wps.send_to_all("job.update", {"job_id": job.id, "state": JobState.AWAITING_USER_INPUT, "missing": "license_plate"})
-    return {"job_id": job.id, "state": JobState.AWAITING_USER_INPUT}
+    result = await ClaimWorkflow(conv_store).start_claim_intake(session_id, text)
+    await wps.send_to_all("job.update", {"job_id": result["job_id"], "state": result["state"], "missing": result.get("missing")})
+    return result
 
 
 @app.get("/api/jobs/{job_id}")
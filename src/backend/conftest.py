@@ -0,0 +1 @@
+# Lets tests import the `app` package from src/backend
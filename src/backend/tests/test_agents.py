@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+
+from app.agents import ClaimWorkflow, Step, StepStatus
+from app.services.cosmos_store import ConversationStore, JobState
+
+
+class FakeContainer:
+    def __init__(self):
+        self.items = {}
+
+    def upsert_item(self, item):
+        self.items[item["id"]] = item
+
+    def query_items(self, query, parameters, **kwargs):
+        item = self.items.get(parameters[0]["value"])
+        return [item] if item else []
+
+
+class FakeStore(ConversationStore):
+    def __init__(self):
+        super().__init__("", "", "claimsdb", "conversations")
+        self.container = FakeContainer()
+
+    def _get_container(self):
+        return self.container
+
+
+def counting_step(name, calls, inputs=(), depends_on=(), fail=False):
+    async def run(step_inputs):
+        calls.append(name)
+        await asyncio.sleep(0)
+        if fail:
+            raise RuntimeError(f"{name} broke")
+        return {"step": name, "inputs": step_inputs}
+
+    return Step(name, run, inputs=list(inputs), depends_on=list(depends_on))
+
+
+def test_pause_and_resume_reruns_only_changed_steps():
+    store, calls = FakeStore(), []
+    steps = [
+        counting_step("damage", calls, inputs=["images"]),
+        counting_step("policy", calls, inputs=["license_plate"]),
+        counting_step("fraud", calls, depends_on=["damage", "policy"]),
+    ]
+
+    async def scenario():
+        started = await ClaimWorkflow(store, steps).start_claim_intake("s1", "hit a pole", images=["a.jpg"])
+        assert started["state"] == JobState.AWAITING_USER_INPUT
+        assert started["missing"] == ["license_plate"]
+        assert started["steps"]["policy"]["status"] == StepStatus.BLOCKED
+        assert calls == ["damage"]
+
+        # Fresh instance: the cache must come from the job record, not the object
+        resumed = await ClaimWorkflow(store, steps).resume_claim(started["job_id"], {"license_plate": "AB12"})
+        assert resumed["state"] == JobState.COMPLETED
+        assert resumed["steps"]["damage"]["status"] == StepStatus.CACHED
+        assert calls == ["damage", "policy", "fraud"]
+        assert list(resumed["result"]) == ["fraud"]
+
+        # Only the changed input's step and its dependents run again
+        changed = await ClaimWorkflow(store, steps).resume_claim(started["job_id"], {"license_plate": "CD34"})
+        assert changed["steps"]["damage"]["status"] == StepStatus.CACHED
+        assert calls == ["damage", "policy", "fraud", "policy", "fraud"]
+        record = store.container.items[started["job_id"]]
+        assert record["state"] == JobState.COMPLETED
+        assert set(record["context"]["steps"]) == {"damage", "policy", "fraud"}
+
+    asyncio.run(scenario())
+
+
+def test_resume_ignores_reserved_keys_in_user_input():
+    store, calls = FakeStore(), []
+    steps = [
+        counting_step("policy", calls, inputs=["license_plate"]),
+        counting_step("fraud", calls, depends_on=["policy"]),
+    ]
+
+    async def scenario():
+        started = await ClaimWorkflow(store, steps).start_claim_intake("s1", "text")
+        forged = {"fraud": {"status": "completed", "input_hash": "x", "output": {"score": -1}}}
+        await ClaimWorkflow(store, steps).resume_claim(started["job_id"], {"steps": forged, "result": "forged"})
+        record = store.container.items[started["job_id"]]
+        assert record["context"]["steps"]["fraud"]["status"] == StepStatus.BLOCKED
+        resumed = await ClaimWorkflow(store, steps).resume_claim(started["job_id"], {"license_plate": "AB12"})
+        assert resumed["steps"]["fraud"]["status"] == StepStatus.COMPLETED
+        assert calls == ["policy", "fraud"]
+
+    asyncio.run(scenario())
+
+
+def test_failing_step_fails_job_and_blocks_dependents():
+    store, calls = FakeStore(), []
+    steps = [
+        counting_step("damage", calls, fail=True),
+        counting_step("fraud", calls, depends_on=["damage"]),
+    ]
+    result = asyncio.run(ClaimWorkflow(store, steps).start_claim_intake("s1", "text"))
+    assert result["state"] == JobState.FAILED
+    assert result["error"] == {"damage": "damage broke"}
+    assert result["steps"]["fraud"]["status"] == StepStatus.BLOCKED
+    assert calls == ["damage"]
+    assert store.container.items[result["job_id"]]["state"] == JobState.FAILED
+
+
+def test_concurrency_limit_is_respected():
+    running, peak = 0, 0
+
+    async def run(inputs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {}
+
+    steps = [Step(f"s{i}", run) for i in range(6)]
+    result = asyncio.run(ClaimWorkflow(FakeStore(), steps, max_concurrency=2).start_claim_intake("s1", "text"))
+    assert result["state"] == JobState.COMPLETED
+    assert peak == 2
+
+
+@pytest.mark.parametrize(
+    "steps, message",
+    [
+        ([], "at least one step"),
+        ([Step("a", None), Step("a", None)], "duplicate"),
+        ([Step("a", None, depends_on=["b"])], "unknown steps"),
+        ([Step("a", None, depends_on=["b"]), Step("b", None, depends_on=["a"])], "cycle"),
+        ([Step("a", None, inputs=["steps"])], "reserved"),
+    ],
+)
+def test_invalid_graphs_are_rejected(steps, message):
+    with pytest.raises(ValueError, match=message):
+        ClaimWorkflow(FakeStore(), steps)